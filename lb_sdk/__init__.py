@@ -1 +1 @@
-from .localbitcoins_sdk import Client
+from .localbitcoins_sdk import Client, AsyncClient, LocalBitcoinsError
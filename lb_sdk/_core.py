@@ -0,0 +1,76 @@
+"""
+Request signing hot path.
+"""
+from urllib import parse
+
+
+# Exact types only: subclasses (e.g. str enums) may stringify differently.
+_PLAIN_VALUE_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def urlencode(params):
+    """
+    Encodes params as parse.urlencode(params, doseq=True) does.
+    Dicts with str keys and str/int/float/bool/None values (the common case)
+    are joined by hand with the same output; anything else goes through
+    parse.urlencode.
+    """
+    if type(params) is not dict:
+        return parse.urlencode(params, doseq=True)
+
+    # quote_from_bytes(..., ' ') plus the '+' replace gives the same output as
+    # parse.quote_plus, without its str/bytes dispatch.
+    quote = parse.quote_from_bytes
+    parts = []
+    for key, value in params.items():
+        if type(key) is not str or type(value) not in _PLAIN_VALUE_TYPES:
+            return parse.urlencode(params, doseq=True)
+        parts.append(quote(key.encode('utf-8'), ' ').replace(' ', '+') + '='
+                     + quote(str(value).encode('utf-8'), ' ').replace(' ', '+'))
+
+    return '&'.join(parts)
+
+
+def encode_params(params, method):
+    params_encoded = ''
+    if params:
+        params_encoded = urlencode(params)
+        if method == 'get':
+            params_encoded = '?' + params_encoded
+
+    return params_encoded
+
+
+def build_signed_request(hmac_template, key_bytes, headers_template, endpoint, method, params, nonce):
+    """
+    Signs a request.
+    :param hmac.HMAC hmac_template: HMAC keyed with the secret, copied for every request.
+    :param bytes key_bytes: HMAC key.
+    :param dict headers_template: Headers to copy the nonce and signature into.
+    :param str endpoint: Localbitcoins endpoint path.
+    :param str method: Request method ('get' or 'post').
+    :param dict params: Request params.
+    :param int nonce: Request nonce.
+    :return tuple: Signed headers and the encoded params that were signed.
+    """
+    # Without params (dashboard, wallet, notifications polls) encode_params
+    # returns '' and nothing is encoded.
+    params_encoded = encode_params(params, method)
+    nonce_bytes = b'%d' % nonce
+    message = b''.join((
+        nonce_bytes,
+        key_bytes,
+        endpoint.encode('latin-1'),
+        params_encoded.encode('latin-1'),
+    ))
+    mac = hmac_template.copy()
+    mac.update(message)
+    signature = mac.hexdigest().upper()
+
+    # The template is copied rather than mutated in place: requests can be signed
+    # concurrently from several threads or tasks.
+    headers = headers_template.copy()
+    headers['Apiauth-Nonce'] = nonce_bytes.decode('ascii')
+    headers['Apiauth-Signature'] = signature
+
+    return headers, params_encoded
@@ -0,0 +1,25 @@
+import logging
+
+from ._core import build_signed_request
+
+logger = logging.getLogger(__name__)
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+
+def prepare_request(hmac_template, key_bytes, headers_template, endpoint, method, params, nonce):
+    """
+    Signs a request and lays it out for the HTTP client.
+    :return tuple: HTTP method, path with query string, headers and body.
+    """
+    headers, params_encoded = build_signed_request(hmac_template, key_bytes, headers_template,
+                                                   endpoint, method, params, nonce)
+    # params_encoded is exactly what was signed, so it is sent as is
+    # instead of letting the HTTP client encode the params a second time.
+    if method == 'get':
+        logger.debug('REQUEST GET %s%s', endpoint, params_encoded)
+        return 'GET', endpoint + params_encoded, headers, None
+
+    logger.debug('REQUEST POST %s body=%s', endpoint, params_encoded)
+    headers['Content-Type'] = FORM_CONTENT_TYPE
+    return 'POST', endpoint, headers, params_encoded
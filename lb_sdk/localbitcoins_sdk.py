@@ -1,75 +1,336 @@
 import hmac
-import json
-import hashlib
-from urllib import parse
-from datetime import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from ._transport import prepare_request
 
-class Client:
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# API error returned when a request's nonce is not above the last one seen for the key.
+NONCE_ERROR_CODE = 42
+
+
+class LocalBitcoinsError(Exception):
+    """
+    Error response from the LocalBitcoins API.
+    """
+
+    def __init__(self, message, error_code=None, errors=None):
+        super().__init__(message)
+        self.message = message
+        self.error_code = error_code
+        self.errors = errors
+
+    def __str__(self):
+        if self.error_code is None:
+            return self.message
+
+        return f'{self.message} (error_code={self.error_code})'
+
+
+class _StreamedItems:
+    """
+    Iterator over items streamed from a response.
+    The response is closed once the items are exhausted; call close() or use it
+    as a context manager to release the connection early.
+    """
+
+    def __init__(self, response, prefix):
+        self._response = response
+        response.raw.decode_content = True
+        self._items = ijson.items(response.raw, prefix)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._items)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._response.close()
+
+
+class _BaseClient:
     lb_url = 'https://localbitcoins.com'
+    nonce_retries = 3
 
     def __init__(self, hmac_auth_key, hmac_auth_secret, debug=False):
         self.hmac_auth_key = hmac_auth_key
         self.hmac_auth_secret = hmac_auth_secret
+        self._key_bytes = hmac_auth_key.encode('latin-1')
+        self._secret_bytes = hmac_auth_secret.encode('latin-1')
+        # The key padding and the inner/outer pad blocks are hashed once here;
+        # every request signs with a copy of this state.
+        self._hmac_template = hmac.new(self._secret_bytes, digestmod='sha256')
         self.debug = debug
+        self._headers = {'Apiauth-key': hmac_auth_key, 'Apiauth-Nonce': '', 'Apiauth-Signature': ''}
+        self._local = threading.local()
+        self._nonce_lock = threading.Lock()
+        self._last_nonce = 0
+
+    def _prepare_request(self, endpoint, method, params):
+        return prepare_request(self._hmac_template, self._key_bytes, self._headers,
+                               endpoint, method, params, self._make_nonce())
+
+    def _should_resend(self, error, attempt):
+        # Concurrent requests can reach the server out of nonce order. A request
+        # rejected for its nonce was not executed, so it is re-signed and resent.
+        return error.error_code == NONCE_ERROR_CODE and attempt < self.nonce_retries
+
+    def _make_nonce(self):
+        # Nonces must be strictly increasing, even for requests sent in the same millisecond.
+        with self._nonce_lock:
+            nonce = max(time.time_ns() // 1_000_000, self._last_nonce + 1)
+            self._last_nonce = nonce
+
+        return nonce
+
+    def _get_json_parser(self):
+        # simdjson parsers are not thread-safe, so each thread gets its own.
+        parser = getattr(self._local, 'json_parser', None)
+        if parser is None:
+            parser = self._local.json_parser = simdjson.Parser()
+
+        return parser
+
+    @staticmethod
+    def _make_error(payload, default_message='Response has no data'):
+        # Error bodies are not guaranteed to be {"error": {...}} objects.
+        error = payload.get('error') if isinstance(payload, dict) else None
+        if isinstance(error, str):
+            return LocalBitcoinsError(error)
+        if not isinstance(error, dict):
+            return LocalBitcoinsError(default_message)
+
+        return LocalBitcoinsError(error.get('message', default_message),
+                                  error.get('error_code'), error.get('errors'))
+
+    @staticmethod
+    def _to_python(value):
+        if isinstance(value, simdjson.Object):
+            return value.as_dict()
+        if isinstance(value, simdjson.Array):
+            return value.as_list()
+
+        return value
+
+    def _parse_data(self, content):
+        logger.debug('RESPONSE DATA %s', content)
+        if simdjson is None:
+            payload = _json.loads(content)
+            if not isinstance(payload, dict) or 'data' not in payload:
+                raise self._make_error(payload)
+
+            return payload['data']
+
+        document = self._get_json_parser().parse(content)
+        if not isinstance(document, simdjson.Object) or 'data' not in document:
+            payload = self._to_python(document)
+            # The traceback keeps this frame alive; a live proxy would block parser reuse.
+            del document
+            raise self._make_error(payload)
 
-    def send_request(self, endpoint: str, method: str = 'get', params: dict = None) -> dict:
+        # Only the 'data' subtree is materialized; sibling fields are never
+        # turned into Python objects.
+        return self._to_python(document['data'])
+
+
+class Client(_BaseClient):
+    max_workers = 8
+    contacts_info_limit = 50
+
+    def __init__(self, hmac_auth_key, hmac_auth_secret, debug=False):
+        super().__init__(hmac_auth_key, hmac_auth_secret, debug)
+        self._session = self._make_session(self.max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes the underlying HTTP session and its pooled connections.
+        """
+        self._session.close()
+
+    def send_request(self, endpoint: str, method: str = 'get', params: dict = None, stream: str = None):
         """
         Sends request to endpoint with params.
         :param str endpoint: Localbitcoins endpoint path.
         :param str method: Request method ('get' or 'post').
         :param dict params: Request params.
-        :return dict: Response from localbitcoins.net in JSON format.
+        :param str stream: ijson prefix inside 'data' (e.g. 'contact_list.item') to stream items from.
+        :return dict: Response from localbitcoins.net in JSON format,
+            or a closeable iterator over the items at the stream prefix.
+        :raises LocalBitcoinsError: If the API returns an error (requests rejected for
+            their nonce are resent up to nonce_retries times first).
         """
-        params_encoded = self._encode_params(params, method)
-        nonce = self._make_nonce()
-        message = self._make_message(nonce, endpoint, params_encoded)
-        signature = self._make_signature(message)
-        headers = self._make_headers(nonce, signature)
+        if stream is not None and ijson is None:
+            raise ImportError('Streaming responses requires ijson: pip install localbitcoins-sdk[ijson]')
 
-        response_data = self._get_response_data(method, endpoint, headers, params)
+        for attempt in range(self.nonce_retries + 1):
+            try:
+                return self._send_request(endpoint, method, params, stream)
+            except LocalBitcoinsError as error:
+                if not self._should_resend(error, attempt):
+                    raise
 
-        return response_data
+    def _send_request(self, endpoint, method, params, stream):
+        http_method, path, headers, body = self._prepare_request(endpoint, method, params)
+        response = self._session.request(http_method, self.lb_url + path, headers=headers, data=body,
+                                         stream=stream is not None)
+        logger.debug('RESPONSE %s %s', response.status_code, path)
+        if stream is not None:
+            return self._stream_items(response, 'data.' + stream)
 
-    @staticmethod
-    def _encode_params(params, method):
-        params_encoded = ''
-        if params:
-            params_encoded = parse.urlencode(params)
-            if method == 'get':
-                params_encoded = '?' + params_encoded
+        return self._parse_data(response.content)
+
+    def send_requests_parallel(self, calls) -> list:
+        """
+        Sends independent requests concurrently over the shared session.
+        The API rejects a nonce lower than the last one it has seen, so a request
+        overtaken by a later one fails with error 42; send_request re-signs such
+        requests with a fresh nonce and resends them up to nonce_retries times.
+        :param list calls: Tuples of send_request arguments (endpoint, method, params).
+        :return list: Response data for every call, in the order of calls.
+        :raises LocalBitcoinsError: If a call fails with any other error, or keeps
+            failing with the nonce error.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.send_request, *call) for call in calls]
+
+        return [future.result() for future in futures]
+
+    def get_contacts_info_all(self, contact_ids) -> list:
+        """
+        Gets info for any number of contacts from /api/contact_info/.
+        The endpoint takes up to 50 ids per call, so ids are split into batches
+        that are requested concurrently with send_requests_parallel. Batches can
+        reach the server out of nonce order; a batch rejected with the nonce
+        error is re-signed and resent, up to nonce_retries times.
+        :param list contact_ids: Contact ids.
+        :return list: Contacts from every batch's contact_list.
+        :raises LocalBitcoinsError: If a batch fails with any other error, or keeps
+            failing with the nonce error.
+        """
+        contact_ids = [str(contact_id) for contact_id in contact_ids]
+        limit = self.contacts_info_limit
+        calls = [
+            ('/api/contact_info/', 'get', {'contacts': ','.join(contact_ids[i:i + limit])})
+            for i in range(0, len(contact_ids), limit)
+        ]
+        results = self.send_requests_parallel(calls)
 
-        return params_encoded
+        return list(chain.from_iterable(result['contact_list'] for result in results))
 
     @staticmethod
-    def _make_nonce():
-        now = datetime.utcnow()
-        epoch = datetime.utcfromtimestamp(0)
-        delta = now - epoch
-        nonce = int(delta.total_seconds() * 1000)
+    def _make_session(pool_maxsize):
+        # Only connection errors are retried: the request never reached the server,
+        # so resending it with the same nonce is safe. Error responses, including
+        # 429/503 with Retry-After, are returned as is.
+        retries = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.2,
+                        respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retries)
+        session = requests.Session()
+        session.mount('https://', adapter)
 
-        return nonce
+        return session
+
+    def _stream_items(self, response, prefix):
+        # Error responses have no items at the prefix; streaming them would look
+        # like an empty result, so the body is read and the error raised here.
+        if response.status_code != 200:
+            with response:
+                content = response.content
+            try:
+                payload = _json.loads(content)
+            except ValueError:
+                payload = None
+            raise self._make_error(payload, f'Unexpected HTTP status {response.status_code}')
+
+        return _StreamedItems(response, prefix)
+
+
+class AsyncClient(_BaseClient):
+    def __init__(self, hmac_auth_key, hmac_auth_secret, debug=False):
+        if httpx is None:
+            raise ImportError('AsyncClient requires httpx: pip install localbitcoins-sdk[async]')
+
+        super().__init__(hmac_auth_key, hmac_auth_secret, debug)
+        # All in-flight requests are multiplexed over a single HTTP/2 connection.
+        self._client = httpx.AsyncClient(http2=True, base_url=self.lb_url, timeout=10.0)
+
+    async def __aenter__(self):
+        return self
 
-    def _make_message(self, nonce, endpoint, params_encoded):
-        return str(nonce) + self.hmac_auth_key + endpoint + params_encoded
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
 
-    def _make_signature(self, message):
-        return hmac.new(bytes(self.hmac_auth_secret, 'latin-1'), msg=bytes(message, 'latin-1'),
-                        digestmod=hashlib.sha256).hexdigest().upper()
+    async def aclose(self):
+        """
+        Closes the underlying HTTP/2 connection.
+        """
+        await self._client.aclose()
 
-    def _make_headers(self, nonce, signature):
-        return {
-            'Apiauth-key': self.hmac_auth_key,
-            'Apiauth-Nonce': str(nonce),
-            'Apiauth-Signature': signature
-        }
+    async def send_request(self, endpoint: str, method: str = 'get', params: dict = None) -> dict:
+        """
+        Sends request to endpoint with params.
+        :param str endpoint: Localbitcoins endpoint path.
+        :param str method: Request method ('get' or 'post').
+        :param dict params: Request params.
+        :return dict: Response from localbitcoins.net in JSON format.
+        :raises LocalBitcoinsError: If the API returns an error (requests rejected for
+            their nonce are resent up to nonce_retries times first).
+        """
+        for attempt in range(self.nonce_retries + 1):
+            try:
+                return await self._send_request(endpoint, method, params)
+            except LocalBitcoinsError as error:
+                if not self._should_resend(error, attempt):
+                    raise
 
-    def _get_response_data(self, method, endpoint, headers, params):
-        if method == 'get':
-            response = requests.get(self.lb_url + endpoint, headers=headers, params=params)
-        else:
-            response = requests.post(self.lb_url + endpoint, headers=headers, data=params)
+    async def _send_request(self, endpoint, method, params):
+        http_method, path, headers, body = self._prepare_request(endpoint, method, params)
+        response = await self._client.request(http_method, path, headers=headers, content=body)
+        logger.debug('RESPONSE %s %s', response.status_code, path)
 
-        return json.loads(response.text)['data']
+        return self._parse_data(response.content)
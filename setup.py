@@ -4,6 +4,13 @@ with open("README.md", "r") as readme_file:
     readme = readme_file.read()
 
 requirements = ["requests>=2"]
+extras = {
+    "orjson": ["orjson"],
+    "simdjson": ["pysimdjson"],
+    "ijson": ["ijson"],
+    "async": ["httpx[http2]"],
+    "brotli": ["brotli"],
+}
 
 setup(
     name="localbitcoins-sdk",
@@ -16,6 +23,7 @@ setup(
     url="https://github.com/exelay/localbitcoins-sdk",
     packages=find_packages(),
     install_requires=requirements,
+    extras_require=extras,
     classifiers=[
         "Programming Language :: Python :: 3.8",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
@@ -0,0 +1,135 @@
+import io
+import json
+import threading
+
+import pytest
+
+from lb_sdk import Client, LocalBitcoinsError
+from lb_sdk import localbitcoins_sdk
+
+NONCE_ERROR = b'{"error": {"message": "Given nonce was too small.", "error_code": 42}}'
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class FakeStreamResponse(FakeResponse):
+    def __init__(self, content, status_code=200):
+        super().__init__(content, status_code)
+        self.raw = io.BytesIO(content)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(params=['simdjson', 'json'])
+def client(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(localbitcoins_sdk, 'simdjson', None)
+    elif localbitcoins_sdk.simdjson is None:
+        pytest.skip('pysimdjson is not installed')
+
+    with Client('hmac-key', 'hmac-secret') as client:
+        yield client
+
+
+def test_parallel_resends_nonce_errors(client):
+    lock = threading.Lock()
+    attempts = {}
+
+    def request(method, url, headers, data, stream):
+        with lock:
+            attempts[url] = attempts.get(url, 0) + 1
+            first = attempts[url] == 1
+        # Every batch is overtaken once before it succeeds.
+        if first:
+            return FakeResponse(NONCE_ERROR)
+        ids = url.split('contacts=')[1].split('%2C')
+        return FakeResponse(json.dumps({'data': {'contact_list': ids}}).encode())
+
+    client._session.request = request
+    contact_ids = list(range(120))
+
+    assert client.get_contacts_info_all(contact_ids) == [str(contact_id) for contact_id in contact_ids]
+    assert sorted(attempts.values()) == [2, 2, 2]
+
+
+def test_parallel_gives_up_after_nonce_retries(client):
+    calls = []
+
+    def request(method, url, headers, data, stream):
+        calls.append(headers['Apiauth-Nonce'])
+        return FakeResponse(NONCE_ERROR)
+
+    client._session.request = request
+
+    with pytest.raises(LocalBitcoinsError) as excinfo:
+        client.send_requests_parallel([('/api/dashboard/',)])
+    assert excinfo.value.error_code == 42
+    # Every resend is signed with a fresh nonce.
+    assert len(set(calls)) == len(calls) == client.nonce_retries + 1
+
+
+def test_parallel_propagates_other_errors(client):
+    calls = []
+
+    def request(method, url, headers, data, stream):
+        calls.append(url)
+        if url.endswith('/api/wallet/'):
+            return FakeResponse(b'{"error": {"message": "HMAC authentication key and signature was given, '
+                                b'but they are invalid.", "error_code": 41}}', 400)
+        return FakeResponse(b'{"data": {"ok": true}}')
+
+    client._session.request = request
+
+    with pytest.raises(LocalBitcoinsError) as excinfo:
+        client.send_requests_parallel([('/api/dashboard/',), ('/api/wallet/',)])
+    assert excinfo.value.error_code == 41
+    assert calls.count(client.lb_url + '/api/wallet/') == 1
+    # The parser is still usable after an error.
+    assert client.send_requests_parallel([('/api/dashboard/',)]) == [{'ok': True}]
+
+
+@pytest.mark.parametrize('status_code, content, message, error_code', [
+    (400, b'{"error": {"message": "Invalid signature", "error_code": 41}}', 'Invalid signature', 41),
+    (502, b'<html>Bad Gateway</html>', 'Unexpected HTTP status 502', None),
+    (500, b'{"error": "boom"}', 'boom', None),
+    (400, b'[1, 2]', 'Unexpected HTTP status 400', None),
+    (503, b'', 'Unexpected HTTP status 503', None),
+])
+def test_stream_raises_errors(client, status_code, content, message, error_code):
+    pytest.importorskip('ijson')
+    response = FakeStreamResponse(content, status_code)
+    client._session.request = lambda *args, **kwargs: response
+
+    with pytest.raises(LocalBitcoinsError) as excinfo:
+        client.send_request('/api/dashboard/', stream='contact_list.item')
+    assert (excinfo.value.message, excinfo.value.error_code) == (message, error_code)
+    assert response.closed
+
+
+def test_stream_items_close_response(client):
+    pytest.importorskip('ijson')
+    content = b'{"data": {"contact_list": [{"contact_id": 1}, {"contact_id": 2}]}}'
+
+    response = FakeStreamResponse(content)
+    client._session.request = lambda *args, **kwargs: response
+    assert list(client.send_request('/api/dashboard/', stream='contact_list.item')) == [
+        {'contact_id': 1}, {'contact_id': 2}]
+    assert response.closed
+
+    response = FakeStreamResponse(content)
+    client._session.request = lambda *args, **kwargs: response
+    with client.send_request('/api/dashboard/', stream='contact_list.item') as items:
+        assert next(items) == {'contact_id': 1}
+    assert response.closed
@@ -0,0 +1,106 @@
+import enum
+import hashlib
+import hmac
+import random
+from urllib import parse
+
+from lb_sdk._core import urlencode
+from lb_sdk._transport import prepare_request
+
+KEY = 'hmac-key'
+SECRET = 'hmac-secret'
+NONCE = 1613000000123
+
+
+def expected_signature(endpoint, params_encoded):
+    # Signature as computed before the HMAC state was precomputed.
+    message = str(NONCE) + KEY + endpoint + params_encoded
+    return hmac.new(bytes(SECRET, 'latin-1'), msg=bytes(message, 'latin-1'),
+                    digestmod=hashlib.sha256).hexdigest().upper()
+
+
+def prepare(endpoint, method, params):
+    hmac_template = hmac.new(SECRET.encode('latin-1'), digestmod='sha256')
+    headers_template = {'Apiauth-key': KEY, 'Apiauth-Nonce': '', 'Apiauth-Signature': ''}
+    return prepare_request(hmac_template, KEY.encode('latin-1'), headers_template,
+                           endpoint, method, params, NONCE)
+
+
+def test_get_signature():
+    params = {'contacts': '1,2,3', 'page': 2}
+    http_method, path, headers, body = prepare('/api/contact_info/', 'get', params)
+    query = '?' + parse.urlencode(params)
+
+    assert (http_method, path, body) == ('GET', '/api/contact_info/' + query, None)
+    assert headers['Apiauth-key'] == KEY
+    assert headers['Apiauth-Nonce'] == str(NONCE)
+    assert headers['Apiauth-Signature'] == expected_signature('/api/contact_info/', query)
+
+
+def test_post_signature():
+    params = {'msg': 'Hello there & bye', 'amount': 0.5}
+    http_method, path, headers, body = prepare('/api/contact_message_post/1/', 'post', params)
+
+    assert (http_method, path, body) == ('POST', '/api/contact_message_post/1/', parse.urlencode(params))
+    assert headers['Content-Type'] == 'application/x-www-form-urlencoded'
+    assert headers['Apiauth-Signature'] == expected_signature('/api/contact_message_post/1/', body)
+
+
+def test_noparams_signature():
+    for method in ('get', 'post'):
+        for params in (None, {}):
+            http_method, path, headers, body = prepare('/api/dashboard/', method, params)
+
+            assert path == '/api/dashboard/'
+            assert body == (None if method == 'get' else '')
+            assert headers['Apiauth-Signature'] == expected_signature('/api/dashboard/', '')
+
+
+def test_headers_template_is_not_mutated():
+    hmac_template = hmac.new(SECRET.encode('latin-1'), digestmod='sha256')
+    headers_template = {'Apiauth-key': KEY, 'Apiauth-Nonce': '', 'Apiauth-Signature': ''}
+    prepare_request(hmac_template, KEY.encode('latin-1'), headers_template, '/api/wallet/', 'post', {'a': 1}, NONCE)
+
+    assert headers_template == {'Apiauth-key': KEY, 'Apiauth-Nonce': '', 'Apiauth-Signature': ''}
+
+
+class Currency(str, enum.Enum):
+    EUR = 'EUR'
+
+
+class Page(enum.IntEnum):
+    FIRST = 1
+
+
+def test_urlencode_matches_parse_urlencode():
+    rng = random.Random(0)
+    alphabet = 'abcXYZ019 &=?/+%#\u00e9\u20ac\U0001f600-_.~'
+    values = [
+        lambda: ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))),
+        lambda: rng.randint(-10 ** 6, 10 ** 6),
+        lambda: rng.uniform(-1000, 1000),
+        lambda: rng.choice((True, False, None)),
+    ]
+    for _ in range(2000):
+        params = {
+            ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))): rng.choice(values)()
+            for _ in range(rng.randint(1, 6))
+        }
+        assert urlencode(params) == parse.urlencode(params, doseq=True)
+
+
+def test_urlencode_falls_back_for_other_params():
+    cases = [
+        [('a', 1), ('a', 2)],
+        {b'key': b'value'},
+        {'ids': [1, 2, 3]},
+        {'ids': (1, 2)},
+        {'ids': {3}},
+        {'ids': range(3)},
+        {'raw': bytearray(b'x y')},
+        {'nested': {'a': 1}},
+        {'currency': Currency.EUR},
+        {'page': Page.FIRST},
+    ]
+    for params in cases:
+        assert urlencode(params) == parse.urlencode(params, doseq=True)